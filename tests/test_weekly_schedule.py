@@ -1,9 +1,9 @@
 import datetime
 import unittest
 
-import freezegun
 import numpy as np
 import pytz
+import time_machine
 from calendra.europe import France
 
 from weeksched.schedule import Day, WeeklySchedule
@@ -31,6 +31,29 @@ class TestCtrlSchedule(unittest.TestCase):
         self.assertIsNotNone(ctrl.schedule)
         self.assertDictEqual(typical_schedule, ctrl.formatted_schedule)
 
+    def test_from_raw_matrix(self):
+        matrix = np.zeros((7, 24, 60), dtype=bool)
+        matrix[2, 7, 3:] = True
+        matrix[6, 23, 59] = True
+        ctrl = WeeklySchedule.from_raw(matrix)
+        self.assertTrue(np.array_equal(matrix, ctrl.schedule))
+        self.assertDictEqual({2: ((7, 3), (8, 0)), 6: ((23, 59), (24, 0))}, ctrl.formatted_schedule)
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 9, 7, 2)))
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 9, 7, 3)))
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 13, 23, 59)))
+
+        with self.assertRaises(AssertionError):
+            WeeklySchedule.from_raw(np.zeros((7, 24), dtype=bool))
+
+    def test_from_raw_overlapping_slots(self):
+        ctrl = WeeklySchedule.from_raw(
+            {
+                0: (((1, 0), (3, 0)), ((2, 0), (5, 0))),
+                6: (((23, 0), (24, 0)), ((23, 0), (24, 0))),
+            }
+        )
+        self.assertDictEqual({0: ((1, 0), (5, 0)), 6: ((23, 0), (24, 0))}, ctrl.formatted_schedule)
+
     def test_fluent(self):
         weekday = ((6, 0), (18, 0))
         saturday = ((6, 0), (12, 0))
@@ -50,6 +73,23 @@ class TestCtrlSchedule(unittest.TestCase):
             ctrl.format_schedule(),
         )
 
+    def test_formatted_schedule_cache(self):
+        weekday = ((6, 0), (18, 0))
+        ctrl = WeeklySchedule().for_timezone("UTC").monday(weekday)
+        self.assertDictEqual({0: weekday}, ctrl.formatted_schedule)
+
+        # cache is invalidated by any change
+        ctrl.tuesday(weekday)
+        self.assertDictEqual({0: weekday, 1: weekday}, ctrl.formatted_schedule)
+        ctrl.shift_start(1, 0)
+        self.assertDictEqual({0: ((7, 0), (18, 0)), 1: ((7, 0), (18, 0))}, ctrl.formatted_schedule)
+
+        # returned values can't alter the schedule
+        ctrl.formatted_schedule.clear()
+        self.assertEqual(2, len(ctrl.formatted_schedule))
+        with self.assertRaises(ValueError):
+            ctrl.schedule[0, 0, 0] = True
+
     def test_empty(self):
         with self.assertRaises(AssertionError):
             WeeklySchedule.from_raw({})
@@ -74,6 +114,23 @@ class TestCtrlSchedule(unittest.TestCase):
             WeeklySchedule.from_raw({0: ((10, 0), (9, 0))})
             self.assertEqual("start time should be before end time", str(e))
 
+    def test_day_schedule_list_slots(self):
+        ctrl = WeeklySchedule.from_raw(
+            {
+                0: ([(7, 0), (20, 0)],),
+                1: ([(7, 0), (20, 0)], [(21, 0), (22, 0)]),
+            }
+        )
+        self.assertDictEqual(
+            {0: ((7, 0), (20, 0)), 1: (((7, 0), (20, 0)), ((21, 0), (22, 0)))},
+            ctrl.formatted_schedule,
+        )
+
+    def test_invalid_day_schedule_format(self):
+        for day_sched in ((), (7, 20), ((),), (((7, 0), (20, 0)), (20, 0)), ((7, 0),)):
+            with self.assertRaises(ValueError):
+                WeeklySchedule.from_raw({0: day_sched})
+
     def test_from_to(self):
         weekday = ((6, 0), (18, 0))
         saturday = ((6, 0), (12, 0))
@@ -99,29 +156,31 @@ class TestCtrlSchedule(unittest.TestCase):
     def test_is_on(self):
         ctrl = WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("UTC")
 
-        with freezegun.freeze_time("2022-02-11 06:59:00+00:00"):
+        with time_machine.travel("2022-02-11 06:59:00+00:00", tick=False):
             self.assertTrue(ctrl.is_on())
 
-        with freezegun.freeze_time("2022-02-11 07:00:00+00:00"):
+        with time_machine.travel("2022-02-11 07:00:00+00:00", tick=False):
             self.assertFalse(ctrl.is_on())
 
-        with freezegun.freeze_time("2022-02-11 19:59:59+00:00"):
+        with time_machine.travel("2022-02-11 19:59:59+00:00", tick=False):
             self.assertFalse(ctrl.is_on())
 
-        with freezegun.freeze_time("2022-02-11 20:00:00+00:00"):
+        with time_machine.travel("2022-02-11 20:00:00+00:00", tick=False):
             self.assertTrue(ctrl.is_on())
 
-        with freezegun.freeze_time("2022-02-12 10:00:00+00:00"):
+        with time_machine.travel("2022-02-12 10:00:00+00:00", tick=False):
             self.assertTrue(ctrl.is_on())
 
+        # evaluated in schedule time zone, 07:30 in Paris
+        ctrl = WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("Europe/Paris")
+        with time_machine.travel("2022-02-11 06:30:00+00:00", tick=False):
+            self.assertFalse(ctrl.is_on())
+
     def test_is_on_working_days_calendar(self):
         ctrl_no_cal = WeeklySchedule.from_raw(self.typical_weekly_schedule()).for_timezone("UTC")
 
-        with freezegun.freeze_time("2022-02-15 10:00:00+00:00"):
-            self.assertTrue(ctrl_no_cal.is_on())
-
-        with freezegun.freeze_time("2024-05-08 10:00:00+00:00"):
-            self.assertTrue(ctrl_no_cal.is_on())
+        self.assertTrue(ctrl_no_cal.is_on_at(self._utc(2022, 2, 15, 10, 0)))
+        self.assertTrue(ctrl_no_cal.is_on_at(self._utc(2024, 5, 8, 10, 0)))
 
         calendar = France()
         ctrl_with_cal = (
@@ -130,11 +189,8 @@ class TestCtrlSchedule(unittest.TestCase):
             .with_working_days_calendar(calendar)
         )
 
-        with freezegun.freeze_time("2022-02-15 10:00:00+00:00"):
-            self.assertTrue(ctrl_with_cal.is_on())
-
-        with freezegun.freeze_time("2024-05-08 10:00:00+00:00"):
-            self.assertFalse(ctrl_with_cal.is_on())
+        self.assertTrue(ctrl_with_cal.is_on_at(self._utc(2022, 2, 15, 10, 0)))
+        self.assertFalse(ctrl_with_cal.is_on_at(self._utc(2024, 5, 8, 10, 0)))
 
         ctrl_with_cal = (
             WeeklySchedule.from_raw(self.typical_weekly_schedule())
@@ -142,11 +198,30 @@ class TestCtrlSchedule(unittest.TestCase):
             .with_working_days_calendar(lambda d: False)
         )
 
-        with freezegun.freeze_time("2022-02-15 10:00:00+00:00"):
-            self.assertFalse(ctrl_with_cal.is_on())
+        self.assertFalse(ctrl_with_cal.is_on_at(self._utc(2022, 2, 15, 10, 0)))
+        self.assertFalse(ctrl_with_cal.is_on_at(self._utc(2024, 5, 8, 10, 0)))
+
+    def test_working_days_calendar_cache(self):
+        evaluated = []
 
-        with freezegun.freeze_time("2024-05-08 10:00:00+00:00"):
-            self.assertFalse(ctrl_with_cal.is_on())
+        def is_working_day(dt):
+            evaluated.append(dt.date())
+            return dt.day != 15
+
+        ctrl = (
+            WeeklySchedule.from_raw(self.typical_weekly_schedule())
+            .for_timezone("UTC")
+            .with_working_days_calendar(is_working_day)
+        )
+
+        for minute in range(3):
+            self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 15, 10, minute)))
+            self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 16, 10, minute)))
+        self.assertListEqual([datetime.date(2022, 2, 15), datetime.date(2022, 2, 16)], evaluated)
+
+        # registering a calendar resets the cache
+        ctrl.with_working_days_calendar(lambda d: True)
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 15, 10, 0)))
 
     def test_all_time(self):
         ctrl = WeeklySchedule().always()
@@ -158,25 +233,16 @@ class TestCtrlSchedule(unittest.TestCase):
             WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("UTC").shift_start(1, 0)
         )
 
-        with freezegun.freeze_time("2022-02-11 00:15:00+00:00"):
-            self.assertFalse(ctrl.is_on())
-
-        with freezegun.freeze_time("2022-02-11 01:15:00+00:00"):
-            self.assertTrue(ctrl.is_on())
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 11, 0, 15)))
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 11, 1, 15)))
 
         # make sure end time is not affected
-        with freezegun.freeze_time("2022-02-11 06:59:00+00:00"):
-            self.assertTrue(ctrl.is_on())
-
-        with freezegun.freeze_time("2022-02-11 07:00:00+00:00"):
-            self.assertFalse(ctrl.is_on())
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 11, 6, 59)))
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 11, 7, 0)))
 
         # check start time of next slot
-        with freezegun.freeze_time("2022-02-11 20:15:00+00:00"):
-            self.assertFalse(ctrl.is_on())
-
-        with freezegun.freeze_time("2022-02-11 21:15:00+00:00"):
-            self.assertTrue(ctrl.is_on())
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 11, 20, 15)))
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 11, 21, 15)))
 
     def test_shift_start_long(self):
         ctrl = (
@@ -190,14 +256,20 @@ class TestCtrlSchedule(unittest.TestCase):
             ctrl.formatted_schedule,
         )
 
-        with freezegun.freeze_time("2022-02-11 04:59:00+00:00"):
-            self.assertFalse(ctrl.is_on())
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 11, 4, 59)))
+        self.assertTrue(ctrl.is_on_at(self._utc(2022, 2, 11, 5, 0)))
+        self.assertFalse(ctrl.is_on_at(self._utc(2022, 2, 11, 23, 59)))
 
-        with freezegun.freeze_time("2022-02-11 05:00:00+00:00"):
-            self.assertTrue(ctrl.is_on())
+    def test_shift_start_none(self):
+        complex_schedule = self.complex_schedule()
+        ctrl = WeeklySchedule.from_raw(complex_schedule).for_timezone("UTC").shift_start(0, 0)
+        self.assertDictEqual(complex_schedule, ctrl.formatted_schedule)
 
-        with freezegun.freeze_time("2022-02-11 23:59:00+00:00"):
-            self.assertFalse(ctrl.is_on())
+    def test_shift_start_whole_day(self):
+        ctrl = (
+            WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("UTC").shift_start(24, 0)
+        )
+        self.assertDictEqual({}, ctrl.formatted_schedule)
 
     def test_shift_start_neg(self):
         with self.assertRaises(AssertionError):
@@ -207,6 +279,14 @@ class TestCtrlSchedule(unittest.TestCase):
                 .shift_start(-1, 0)
             )
 
+    def test_str(self):
+        ctrl = WeeklySchedule.from_raw(self.typical_weekly_schedule()).for_timezone("UTC")
+        self.assertEqual(str(ctrl), str(ctrl.clone()))
+        self.assertNotEqual(str(ctrl), str(WeeklySchedule.invert(ctrl)))
+        self.assertNotIn("schedule=", str(ctrl))
+        self.assertIn(f"schedule={self.typical_weekly_schedule()}", ctrl.pretty())
+        self.assertIn("timezone=UTC", ctrl.pretty())
+
     def test_clone(self):
         ctrl = WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("UTC")
         ctrl2 = ctrl.clone().for_timezone("Europe/Luxembourg")
@@ -242,6 +322,11 @@ class TestCtrlSchedule(unittest.TestCase):
             ctrl2.formatted_schedule,
         )
 
+    def test_invert_twice(self):
+        ctrl = WeeklySchedule.from_raw(self.complex_schedule()).for_timezone("Europe/Paris")
+        self.assertEqual(ctrl, WeeklySchedule.invert(WeeklySchedule.invert(ctrl)))
+        self.assertEqual(WeeklySchedule.never(), WeeklySchedule.invert(WeeklySchedule.always()))
+
     def test_is_defined_for_day(self):
         schedule = (
             WeeklySchedule().for_timezone("UTC").from_to(Day.Monday, Day.Friday, ((6, 0), (18, 0)))
@@ -250,6 +335,11 @@ class TestCtrlSchedule(unittest.TestCase):
         for i in range(7):
             self.assertEqual(i in range(0, 5), schedule.is_defined_for_day(i))
 
+        self.assertTrue(schedule.is_defined_for_day(Day.Friday))
+        self.assertFalse(schedule.is_defined_for_day(-1))
+        with self.assertRaises(IndexError):
+            schedule.is_defined_for_day(7)
+
     @staticmethod
     def typical_weekly_schedule():
         return {
@@ -272,6 +362,10 @@ class TestCtrlSchedule(unittest.TestCase):
             6: ((0, 0), (24, 0)),
         }
 
+    @staticmethod
+    def _utc(*args):
+        return datetime.datetime(*args, tzinfo=pytz.UTC)
+
     @staticmethod
     def _utc_offset(tz):
         now = datetime.datetime.now(tz)
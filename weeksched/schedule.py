@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from datetime import datetime
+import functools
+import time
+from datetime import date, datetime
 from enum import Enum
 from typing import Any
 
@@ -8,6 +10,19 @@ import numpy as np
 import pytz
 from calendra.core import Calendar
 
+# number of 1-minute slots in a day
+_DAY_MINUTES = 24 * 60
+# number of bytes needed to store a day of 1-minute slots, 1 bit per slot
+_DAY_BYTES = _DAY_MINUTES // 8
+# max number of dates for which working day evaluations are cached
+_WORKING_DAYS_CACHE_SIZE = 400
+
+
+@functools.lru_cache(maxsize=64)
+def _tz(name: str) -> Any:
+    """Get a pytz timezone from its name, caching the lookup."""
+    return pytz.timezone(name)
+
 
 class Day(Enum):
     """A simple enum to represent the days of the week."""
@@ -25,18 +40,43 @@ class WeeklySchedule:
     """Weekly schedule class.
 
     This class is used to define a weekly schedule for control loops. It's implemented as a
-    7x24x60 matrix where each cell represents a 1-minute slot. The schedule is defined by
-    setting the slots to True or False. This implementation trades memory and instantiation
-    time for a fast evaluation and easy manipulation of the schedule.
+    bitmap of 7x24x60 bits where each bit represents a 1-minute slot. The schedule is defined by
+    setting the slots to True or False. Bits are packed in 1260 bytes (each day starts on a byte
+    boundary), which keeps instances small while allowing a fast evaluation and cheap bulk
+    operations. The unpacked 7x24x60 matrix remains available through `schedule`.
     """
 
+    __slots__ = (
+        "_bits",
+        "_timezone",
+        "_pytz",
+        "_is_working_day_fun",
+        "_working_days",
+        "_flat",
+        "_fmt_cache",
+    )
+
     def __init__(self):
-        self._schedule: np.array = np.zeros((7, 24, 60), dtype=bool)
+        self._bits: np.ndarray = np.zeros(7 * _DAY_BYTES, dtype=np.uint8)
         self._timezone: str | None = None
         self._pytz: Any | None = None
         self._is_working_day_fun: Calendar | callable | None = None
+        self._working_days: dict[date, bool] = {}
+        # immutable copy of the bitmap, faster to index than the numpy array
+        self._flat: bytes = self._bits.tobytes()
+        self._fmt_cache: dict | None = None
 
     def __str__(self):
+        return (
+            f"WeeklySchedule("
+            f"hash={hash(self._flat)}, "
+            f"timezone={self._timezone}, "
+            f"is_working_day_fun={self._is_working_day_fun}"
+            f")"
+        )
+
+    def pretty(self) -> str:
+        """Returns a human-readable description of the schedule, including its formatted slots."""
         return (
             f"WeeklySchedule("
             f"schedule={self.formatted_schedule}, "
@@ -49,7 +89,7 @@ class WeeklySchedule:
         if not isinstance(other, WeeklySchedule):
             return False
         return (
-            np.array_equal(self.schedule, other.schedule)
+            np.array_equal(self._bits, other._bits)
             and self.timezone == other.timezone
             and self.is_working_day_fun == other.is_working_day_fun
         )
@@ -61,16 +101,18 @@ class WeeklySchedule:
             (slot_n_hour, slot_n_min))}
         """
 
+        schedule = self.schedule
+
         # special cases for all True or all False schedule
-        if np.all(self._schedule):
+        if np.all(schedule):
             return {day: ((0, 0), (24, 0)) for day in range(7)}
-        elif not np.any(self._schedule):
+        elif not np.any(schedule):
             return {}
 
         formated_schedule = {}
         # loop over the days
         for day in range(7):
-            day_schedule = self._schedule[day]
+            day_schedule = schedule[day]
 
             # special cases for all True or all False schedule
             if np.all(day_schedule):
@@ -79,51 +121,26 @@ class WeeklySchedule:
                 continue
             # normal case
             else:
-                # transform the slots back into a raw schedule
-                flat_slots = day_schedule.reshape(24 * 60)
-                # roll the slots by 1 minute
-                rolled_slots = np.roll(flat_slots, 1, axis=0)
-                # keep the first slot unchanged (roll wraps around and may change the first slot)
-                rolled_slots[0] = flat_slots[0]
-                # find where slots start and end
-                slot_indexes = np.argwhere(rolled_slots != flat_slots).reshape(-1, 1)
-                # add a dummy slot at the start and the end if day schedule starts or ends at 0 or 24, respectively
-                if day_schedule[0, 0]:
-                    slot_indexes = np.vstack((0, slot_indexes))
-                if day_schedule[-1, -1]:
-                    slot_indexes = np.vstack((slot_indexes, 24 * 60))
-
-                # retain a 1D array
-                # ie content will be [0, 420, 1200, 1440] for the
+                # find where slots start and end, ie minutes that differ from the previous one
+                flat_slots = day_schedule.reshape(_DAY_MINUTES)
+                edges = (np.flatnonzero(np.diff(flat_slots)) + 1).tolist()
+                # add an edge at the start and the end if day schedule starts or ends at 0 or 24,
+                # respectively. ie edges will be [0, 420, 1200, 1440] for the
                 # 2-slot schedule (((0, 0), (7, 0)), ((20, 0), (24, 0)))
-                slot_indexes = slot_indexes.squeeze(-1)
-
-                # loop over the slot indexes and group them into start/end pairs
-                day_slots = []
-                start = end = None
-                for idx, slot_index in np.ndenumerate(slot_indexes):
-                    # convert slot index to hour and minute
-                    hour, minute = divmod(slot_index, 60)
-                    # convert numpy int to python int
-                    hour = hour.item()  # type: ignore
-                    minute = minute.item()  # type: ignore
-
-                    # if idx is even, it's a start, if it's odd, it's an end
-                    if idx[0] % 2 == 0:
-                        start = (hour, minute)
-                    else:
-                        end = (hour, minute)
-
-                    if start and end:
-                        day_slots.append((start, end))
-                        start = end = None
-
-                # squeeze 1 dimension if day has only 1 slot but is a 3D array
+                if flat_slots[0]:
+                    edges.insert(0, 0)
+                if flat_slots[-1]:
+                    edges.append(_DAY_MINUTES)
+
+                # even edges are slot starts, odd edges are slot ends
+                day_slots = [
+                    (divmod(start, 60), divmod(end, 60))
+                    for start, end in zip(edges[0::2], edges[1::2])
+                ]
+
+                # squeeze 1 dimension if day has only 1 slot
                 # ie (((7, 0), (20, 0)),) -> ((7, 0), (20, 0))
-                if np.array(day_slots).ndim == 3 and len(day_slots) == 1:
-                    day_slots = day_slots[0]
-
-                formated_schedule[day] = tuple(day_slots)
+                formated_schedule[day] = tuple(day_slots) if len(day_slots) > 1 else day_slots[0]
 
         return formated_schedule
 
@@ -134,7 +151,7 @@ class WeeklySchedule:
         :return: self
         """
         self._timezone = tz
-        self._pytz = pytz.timezone(tz)
+        self._pytz = _tz(tz)
         return self
 
     def with_working_days_calendar(self, calendar: Calendar | callable) -> WeeklySchedule:
@@ -144,13 +161,15 @@ class WeeklySchedule:
 
         :param calendar: calendar or callable that takes a datetime and returns a boolean.
             If a callable is passed, it must take a datetime as argument and return a
-            boolean indicating if the day is a working day.
+            boolean indicating if the day is a working day. Results are cached per date, so
+            it must only depend on the date of the given datetime.
         :return: self
         """
         if callable(calendar):
             self._is_working_day_fun = calendar
         else:
             self._is_working_day_fun = calendar.is_working_day
+        self._working_days = {}
         return self
 
     @staticmethod
@@ -172,13 +191,17 @@ class WeeklySchedule:
         assert isinstance(raw_sched, (dict, np.ndarray)), "raw_sched should be a dict or np.ndarray"
         assert isinstance(time_zone, str), "time_zone should be a string"
 
-        sched = WeeklySchedule()
-
         if isinstance(raw_sched, dict):
             assert raw_sched, "raw schedule can't be empty"
-            sched._schedule = WeeklySchedule.to_matrix(raw_sched)
-        elif isinstance(raw_sched, np.ndarray):
-            sched._schedule = raw_sched
+            raw_sched = WeeklySchedule.to_matrix(raw_sched)
+        else:
+            assert raw_sched.shape == (7, 24, 60), "weekly schedule should be a 7x24x60 matrix"
+            assert np.all(raw_sched >= 0), "weekly schedule should have positive values"
+            assert np.all(raw_sched <= 1), "weekly schedule should have values <= 1"
+
+        sched = WeeklySchedule()
+        sched._bits = WeeklySchedule._pack(raw_sched)
+        sched._refresh_caches()
 
         sched.for_timezone(time_zone)
         sched._validate()
@@ -202,7 +225,13 @@ class WeeklySchedule:
         schedule inverted. Other properties are not copied.
         :param other: weekly schedule to invert
         """
-        return WeeklySchedule.from_raw(~other.schedule).for_timezone(other.timezone)
+        sched = WeeklySchedule()
+        # 10080 bits fill whole bytes, so no padding bit needs to be masked out
+        sched._bits = ~other._bits
+        sched._refresh_caches()
+        sched._timezone = other._timezone
+        sched._pytz = other._pytz
+        return sched
 
     @staticmethod
     def from_to(day_start: Day, day_end: Day, day_sched: tuple) -> WeeklySchedule:
@@ -214,8 +243,10 @@ class WeeklySchedule:
         :return:
         """
         sched = WeeklySchedule()
-        for day in range(day_start.value, day_end.value + 1):
-            sched._set_day_schedule(day, day_sched)
+        # pack the day schedule once and broadcast it to all days of the range
+        day_bits = sched._bits.reshape(7, _DAY_BYTES)
+        day_bits[day_start.value : day_end.value + 1] = sched._pack(sched.to_vector(day_sched))
+        sched._refresh_caches()
         return sched
 
     def monday(self, day_sched: tuple) -> WeeklySchedule:
@@ -264,49 +295,61 @@ class WeeklySchedule:
         total_minutes_shift = hours * 60 + minutes
         assert total_minutes_shift >= 0, "start should be postponed by a positive number of minutes"
 
-        # flatten schedule so we can roll it
-        day_schedules = self._schedule.reshape(7, 24 * 60)
+        if total_minutes_shift == 0:
+            return self
 
-        for day in range(7):
-            # apply shift to slots
-            shifted_slots = np.concatenate(
-                (np.zeros(total_minutes_shift, dtype=bool), day_schedules[day])
-            )
-            # remove items that were shifted at end
-            shifted_slots = shifted_slots[:-total_minutes_shift]
-
-            # mask out items that were shifted at end of each slot.
-            # ie
-            # initial: 0 0 0 1 1 1 0 0 0
-            # shifted: 0 0 0 0 1 1 1 0 0
-            # result:  0 0 0 0 1 1 0 0 0
-            day_schedules[day] = day_schedules[day] & shifted_slots
-
-        self._schedule = day_schedules.reshape(7, 24, 60)
-        self._validate()
+        # unpack and flatten schedule so all days are shifted at once
+        day_schedules = self.schedule.reshape(7, _DAY_MINUTES)
+
+        # apply shift to slots, dropping items that were shifted past the end of each day
+        shifted_slots = np.zeros_like(day_schedules)
+        shifted_slots[:, total_minutes_shift:] = day_schedules[:, :-total_minutes_shift]
+
+        # mask out items that were shifted at end of each slot.
+        # ie
+        # initial: 0 0 0 1 1 1 0 0 0
+        # shifted: 0 0 0 0 1 1 1 0 0
+        # result:  0 0 0 0 1 1 0 0 0
+        np.bitwise_and(day_schedules, shifted_slots, out=shifted_slots)
+
+        self._bits = self._pack(shifted_slots)
+        self._refresh_caches()
 
         return self
 
     def clone(self) -> WeeklySchedule:
         """Create a deep copy of the weekly schedule."""
         new_sched = WeeklySchedule()
-        new_sched._schedule = self._schedule.copy()
+        new_sched._bits = self._bits.copy()
+        new_sched._flat = self._flat
+        new_sched._fmt_cache = self._fmt_cache
         if self._timezone:
             new_sched._timezone = str(self._timezone)
-            new_sched._pytz = pytz.timezone(self._timezone) if self._pytz else None
+            new_sched._pytz = self._pytz
         if self._is_working_day_fun:
             new_sched._is_working_day_fun = self._is_working_day_fun
         return new_sched
 
     @property
     def schedule(self) -> np.array:
-        """Returns the raw schedule as a (7, 24, 60) matrix of 1-minute slots."""
-        return self._schedule
+        """Returns the raw schedule as a (7, 24, 60) matrix of 1-minute slots.
+
+        The matrix is unpacked from the underlying bitmap on each call and is read-only: use the
+        day setters or `shift_start` to modify the schedule.
+        """
+        schedule = np.unpackbits(self._bits, bitorder="little").view(bool).reshape(7, 24, 60)
+        schedule.setflags(write=False)
+        return schedule
 
     @property
     def formatted_schedule(self) -> dict:
-        """Returns the formated schedule."""
-        return self.format_schedule()
+        """Returns the formated schedule.
+
+        The result is computed once and cached until the schedule is modified.
+        """
+        if self._fmt_cache is None:
+            self._fmt_cache = self.format_schedule()
+        return dict(self._fmt_cache)
 
     @property
     def timezone(self) -> str | None:
@@ -324,6 +367,10 @@ class WeeklySchedule:
 
         :return: True if current time falls in defined weekly schedule.
         """
+        if self._pytz is pytz.utc and self._is_working_day_fun is None:
+            # fast path avoiding datetime conversions: Unix epoch started on a Thursday
+            days, minute = divmod(int(time.time()) // 60, _DAY_MINUTES)
+            return self._is_on_slot((days + 3) % 7 * _DAY_MINUTES + minute)
         return self.is_on_at(datetime.now(self._pytz))
 
     def is_on_at(self, dt: datetime) -> bool:
@@ -337,11 +384,11 @@ class WeeklySchedule:
         assert isinstance(dt, datetime), "dt should be a datetime"
 
         # evaluate if day is a working day
-        if self._is_working_day_fun is not None and not self._is_working_day_fun(dt):
+        if self._is_working_day_fun is not None and not self._is_working_day(dt):
             return False
 
         # evaluate weekly schedule
-        return self._is_on_weekly_schedule(dt.weekday(), dt.hour, dt.minute)
+        return self._is_on_slot((dt.weekday() * 24 + dt.hour) * 60 + dt.minute)
 
     def is_defined_for_day(self, day: Day | int) -> bool:
         """Checks if a day schedule is defined for a given day.
@@ -349,68 +396,101 @@ class WeeklySchedule:
         :param day: day to check
         :return: True if a day schedule is defined for the given day.
         """
-        return np.any(self._schedule[day.value if isinstance(day, Day) else day])
-
-    def _is_on_weekly_schedule(self, weekday: int, hour: int, minute: int) -> bool:
-        """Checks if given time falls in defined weekly schedule for a given weekday."""
-        return self._schedule[weekday, hour, minute]
+        day = day.value if isinstance(day, Day) else day
+        return bool(self._bits.reshape(7, _DAY_BYTES)[day].any())
+
+    def _is_working_day(self, dt: datetime) -> bool:
+        """Checks if given time falls on a working day, caching the evaluation per date."""
+        day = dt.date()
+        is_working_day = self._working_days.get(day)
+        if is_working_day is None:
+            # keep memory bounded for long-lived schedules
+            if len(self._working_days) >= _WORKING_DAYS_CACHE_SIZE:
+                self._working_days.clear()
+            is_working_day = self._working_days[day] = bool(self._is_working_day_fun(dt))
+        return is_working_day
+
+    def _is_on_slot(self, slot: int) -> bool:
+        """Checks if given 1-minute slot of the week, starting Monday 00:00, is on."""
+        return self._flat[slot >> 3] >> (slot & 7) & 1 == 1
 
     def _set_day_schedule(self, day: int, sched: tuple):
         """Set a day schedule."""
-        self._schedule[day] = self.to_vector(sched)
-        self._validate()
+        self._bits.reshape(7, _DAY_BYTES)[day] = self._pack(self.to_vector(sched))
+        self._refresh_caches()
+
+    def _refresh_caches(self):
+        """Refresh values derived from the schedule bitmap. Must be called after any change."""
+        self._flat = self._bits.tobytes()
+        self._fmt_cache = None
+
+    @staticmethod
+    def _pack(slots: np.ndarray) -> np.ndarray:
+        """Pack 1-minute slots into a bitmap, 1 bit per slot."""
+        return np.packbits(np.asarray(slots, dtype=bool).reshape(-1), bitorder="little")
 
     @staticmethod
     def to_matrix(ctrl_sched: dict) -> np.array:
         """Transform a weekly schedule into a 7x24x60 matrix."""
-        slots = np.zeros((7, 24, 60), dtype=bool)
+        starts = []
+        ends = []
         for day, day_sched in ctrl_sched.items():
             assert day in range(7), "day should be in range 0-6"
-            slots[day] = WeeklySchedule.to_vector(day_sched)
-        return slots
+            for start_idx, end_idx in WeeklySchedule._to_slot_indexes(day_sched):
+                starts.append(day * _DAY_MINUTES + start_idx)
+                ends.append(day * _DAY_MINUTES + end_idx)
+
+        # count slots starting and ending at each minute of the week, the minute is on if the
+        # running count of open slots is positive
+        deltas = np.zeros(7 * _DAY_MINUTES + 1, dtype=np.int32)
+        np.add.at(deltas, np.asarray(starts, dtype=np.intp), 1)
+        np.add.at(deltas, np.asarray(ends, dtype=np.intp), -1)
+        return (np.cumsum(deltas[:-1]) > 0).reshape(7, 24, 60)
 
     @staticmethod
     def to_vector(day_sched: tuple) -> np.array:
         """Transform a day schedule into a 1-minute slot vector of shape (24, 60)."""
-        slots = np.zeros(24 * 60, dtype=bool)
+        slots = np.zeros(_DAY_MINUTES, dtype=bool)
+        for start_idx, end_idx in WeeklySchedule._to_slot_indexes(day_sched):
+            slots[start_idx:end_idx] = 1
+        return slots.reshape(24, 60)
+
+    @staticmethod
+    def _to_slot_indexes(day_sched: tuple) -> list[tuple[int, int]]:
+        """Transform a day schedule into a list of (start, end) minute indexes."""
+        slot_indexes = []
 
         def define_slot(s, e):
-            """Define a slot in the slots vector."""
+            """Define a slot from its start and end times."""
             for t, lbl in zip([s, e], ["start", "end"]):
                 assert isinstance(t, tuple), f"{lbl} time should be a tuple"
                 assert (0, 0) <= t <= (24, 0), f"{lbl} time should be 00:00 <= x <= 24:00"
             assert s < e, "start time should be before end time"
 
-            start_idx = s[0] * 60 + s[1]
-            end_idx = e[0] * 60 + e[1]
-            slots[start_idx:end_idx] = 1
+            slot_indexes.append((s[0] * 60 + s[1], e[0] * 60 + e[1]))
 
         # depending on the day schedule format, we may have a 2D or 3D tuple
-        ndim = np.array(day_sched).ndim
-        if ndim == 2:
-            start = day_sched[0]
-            end = day_sched[1]
-            define_slot(start, end)
-        elif ndim == 3:
-            for sched in day_sched:
-                if isinstance(sched[0], tuple):
-                    start = sched[0]
-                    end = sched[1]
-                else:
-                    raise ValueError("Invalid day schedule format. Expected 2D or 3D tuple.")
-
-                define_slot(start, end)
-        else:
-            raise ValueError(f"Invalid day schedule format. Expected 2D or 3D tuple. Got {ndim}D.")
+        if not day_sched or not isinstance(day_sched[0], (tuple, list)) or not day_sched[0]:
+            raise ValueError("Invalid day schedule format. Expected 2D or 3D tuple.")
+        day_slots = day_sched if isinstance(day_sched[0][0], (tuple, list)) else (day_sched,)
 
-        return slots.reshape(24, 60)
+        for sched in day_slots:
+            if (
+                not isinstance(sched, (tuple, list))
+                or len(sched) != 2
+                or not isinstance(sched[0], tuple)
+            ):
+                raise ValueError("Invalid day schedule format. Expected 2D or 3D tuple.")
+            define_slot(sched[0], sched[1])
+
+        return slot_indexes
 
     def _validate(self):
         """Validate the weekly schedule.
 
-        It essentially checks that the underlying structure is correct.
+        It essentially checks that the underlying structure is correct. Day setters and
+        `shift_start` preserve that structure, so it's only needed when a schedule is built from
+        raw data.
         """
-        assert len(self._schedule) > 0, "weekly schedule can't be empty"
-        assert self._schedule.shape == (7, 24, 60), "weekly schedule should be a 7x24x60 matrix"
-        assert np.all(self._schedule >= 0), "weekly schedule should have positive values"
-        assert np.all(self._schedule <= 1), "weekly schedule should have values <= 1"
+        assert self._bits.dtype == np.uint8, "weekly schedule should be a packed bitmap"
+        assert self._bits.shape == (7 * _DAY_BYTES,), "weekly schedule should have 7x24x60 bits"